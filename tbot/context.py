@@ -1,11 +1,9 @@
-import collections
 import contextlib
 import typing
 from typing import (
     Any,
     Callable,
     ContextManager,
-    DefaultDict,
     Dict,
     Generic,
     Iterator,
@@ -26,11 +24,31 @@ M = TypeVar("M", bound=machine.Machine)
 
 
 class InstanceManager(Generic[M]):
-    def __init__(self) -> None:
-        self._cx = contextlib.ExitStack()
+    __slots__ = (
+        "_cm",
+        "_current_users",
+        "_instance",
+        "_available",
+        "_alive",
+        "_machine_class",
+    )
+
+    def __init__(
+        self,
+        alive: "Optional[Dict[InstanceManager, None]]" = None,
+        machine_class: Optional[Type[M]] = None,
+    ) -> None:
+        # Context-manager which produced the instance.  As there is only ever
+        # one, it is entered and exited directly instead of using an ExitStack.
+        self._cm: Optional[ContextManager[M]] = None
         self._current_users = 0
         self._instance: Optional[M] = None
         self._available = False
+        # Live instance managers, shared with the owning context.  A dict is
+        # used as an insertion-ordered set to keep warnings in a stable order.
+        self._alive = alive if alive is not None else {}
+        # Machine class this manager is registered for in its context
+        self._machine_class = machine_class
 
     def init(
         self,
@@ -41,18 +59,21 @@ class InstanceManager(Generic[M]):
         if self._instance is not None:
             raise Exception("trying to re-initialize a live instance")
 
-        self._cx = contextlib.ExitStack()
         self._available = True
 
         if instance is not None and context is not None:
             raise ValueError("cannot have both `context` and `instance` arguments")
         elif instance is not None:
-            self._instance = self._cx.enter_context(instance)  # type: ignore
+            cm: ContextManager[M] = instance  # type: ignore
         elif context is not None:
-            self._instance = self._cx.enter_context(context)
+            cm = context
         else:
             raise ValueError("needs either `context` or `instance` argument")
 
+        self._instance = cm.__enter__()
+        self._cm = cm
+        self._alive[self] = None
+
     def teardown(self) -> None:
         if self._instance is None:
             raise Exception("trying to de-init a closed instance")
@@ -61,8 +82,11 @@ class InstanceManager(Generic[M]):
         # prevent it from running its deinitialization code:
         self._instance._rc = 1
 
-        self._cx.close()
+        cm, self._cm = self._cm, None
+        if cm is not None:
+            cm.__exit__(None, None, None)
         self._instance = None
+        self._alive.pop(self, None)
 
     @contextlib.contextmanager
     def request(self, exclusive: bool = False) -> Iterator[M]:
@@ -96,6 +120,21 @@ class InstanceManager(Generic[M]):
         return self._instance is not None
 
 
+class _InstanceManagers(dict):
+    """Creates the InstanceManager for a machine class on first access."""
+
+    __slots__ = ("_alive",)
+
+    def __init__(self, alive: Dict[InstanceManager, None]) -> None:
+        super().__init__()
+        self._alive = alive
+
+    def __missing__(self, machine_class: Type[machine.Machine]) -> InstanceManager:
+        manager: InstanceManager = InstanceManager(self._alive, machine_class)
+        self[machine_class] = manager
+        return manager
+
+
 class Context(typing.ContextManager):
     """
     A context which machines can be registered in and where instances can be retrieved from.
@@ -110,9 +149,10 @@ class Context(typing.ContextManager):
         self._weak_roles: Set[Type[tbot.role.Role]] = set()
         self._open_contexts = 0
 
-        self._instances: DefaultDict[
+        self._alive: Dict[InstanceManager, None] = {}
+        self._instances: Dict[
             Type[machine.Machine], InstanceManager
-        ] = collections.defaultdict(InstanceManager)
+        ] = _InstanceManagers(self._alive)
 
         if add_defaults:
             tbot.role._register_default_machines(self)
@@ -301,15 +341,17 @@ class Context(typing.ContextManager):
         self._open_contexts -= 1
 
         if self._open_contexts == 0:
-            for ty, inst in self._instances.items():
-                if inst.is_alive():
-                    tbot.log.warning(f"Found dangling {ty!r} instance in this context")
+            for inst in self._alive:
+                ty = inst._machine_class
+                tbot.log.warning(f"Found dangling {ty!r} instance in this context")
 
 
 T = TypeVar("T")
 
 
 class ContextHandle:
+    __slots__ = ("ctx", "_exitstack")
+
     def __init__(self, ctx: Context, exitstack: contextlib.ExitStack) -> None:
         self.ctx = ctx
         self._exitstack = exitstack
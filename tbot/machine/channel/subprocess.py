@@ -15,6 +15,7 @@
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
 import fcntl
+import math
 import os
 import pty
 import select
@@ -29,9 +30,46 @@ from . import channel
 
 READ_CHUNK_SIZE = 4096
 
+_WINSZ = struct.Struct("HHHH")
+
+# Largest timeout (in milliseconds) accepted by poll()
+_POLL_MAX_TIMEOUT = 2 ** 31 - 1
+
+
+def _session_has_processes(sid: int) -> bool:
+    """Check whether any process (including zombies) is left in session ``sid``."""
+    try:
+        pids = [pid for pid in os.listdir("/proc") if pid.isdigit()]
+    except FileNotFoundError:
+        # No procfs available, ask ps(1) instead
+        return (
+            subprocess.call(
+                ["ps", "-s", str(sid)],
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+            )
+            == 0
+        )
+
+    for pid in pids:
+        try:
+            with open(f"/proc/{pid}/stat", "rb") as f:
+                stat = f.read()
+        except OSError:
+            # Process is already gone
+            continue
+
+        # The command name is enclosed in parentheses and might contain
+        # spaces, so start splitting after it.  The session id is the 6th
+        # field overall.
+        if int(stat.rsplit(b")", 1)[1].split()[3]) == sid:
+            return True
+
+    return False
+
 
 class SubprocessChannelIO(channel.ChannelIO):
-    __slots__ = ("pty_master", "p")
+    __slots__ = ("pty_master", "p", "_poll", "_poll_out")
 
     def __init__(self) -> None:
         self.pty_master, pty_slave = pty.openpty()
@@ -48,22 +86,53 @@ class SubprocessChannelIO(channel.ChannelIO):
         flags = flags | os.O_NONBLOCK
         fcntl.fcntl(self.pty_master, fcntl.F_SETFL, flags)
 
+        # Register the pty once instead of building a new fd-set on each read
+        self._poll = select.poll()
+        self._poll.register(self.pty_master, select.POLLIN)
+        self._poll_out = select.poll()
+        self._poll_out.register(self.pty_master, select.POLLOUT)
+
     def write(self, buf: bytes) -> int:
         if self.closed:
             raise channel.ChannelClosedException()
 
         channel._debug_log(self, buf, True)
-        bytes_written = os.write(self.pty_master, buf)
+        while True:
+            try:
+                bytes_written = os.write(self.pty_master, buf)
+                break
+            except BlockingIOError:
+                # The pty's input buffer is full; wait until the other side
+                # has consumed some of it instead of failing the write.
+                self._poll_out.poll(1000)
+                if self.closed:
+                    raise channel.ChannelClosedException()
+
         if bytes_written == 0:
             raise channel.ChannelClosedException
         return bytes_written
 
     def read(self, n: int, timeout: typing.Optional[float] = None) -> bytes:
+        # Try reading right away:  While a command is producing output there
+        # is usually data pending already and we can skip waiting for it.
+        try:
+            return channel._debug_log(self, os.read(self.pty_master, n))
+        except BlockingIOError:
+            pass
+        except OSError:
+            raise channel.ChannelClosedException
+
         if not self.closed:
             # If the process is still running, wait
             # for one byte or the timeout to arrive
-            r, _, _ = select.select([self.pty_master], [], [], timeout)
-            if self.pty_master not in r:
+            timeout_ms = None
+            if timeout is not None:
+                # poll() would treat a negative timeout as infinite and
+                # rejects values which don't fit into a C int.
+                if timeout < 0:
+                    raise ValueError("timeout must be non-negative")
+                timeout_ms = min(math.ceil(timeout * 1000), _POLL_MAX_TIMEOUT)
+            if not self._poll.poll(timeout_ms):
                 raise TimeoutError()
 
         try:
@@ -77,6 +146,8 @@ class SubprocessChannelIO(channel.ChannelIO):
 
         sid = os.getsid(self.p.pid)
         self.p.terminate()
+        self._poll.unregister(self.pty_master)
+        self._poll_out.unregister(self.pty_master)
         os.close(self.pty_master)
         self.p.wait()
 
@@ -86,14 +157,7 @@ class SubprocessChannelIO(channel.ChannelIO):
         # quick as possible this is implemented as exponential backoff and will
         # give up after 1 second (1.27 to be exact) and emit a warning.
         for t in range(7):
-            if (
-                subprocess.call(
-                    ["ps", "-s", str(sid)],
-                    stdout=subprocess.DEVNULL,
-                    stderr=subprocess.DEVNULL,
-                )
-                != 0
-            ):
+            if not _session_has_processes(sid):
                 break
             time.sleep(2 ** t / 100)
         else:
@@ -108,7 +172,7 @@ class SubprocessChannelIO(channel.ChannelIO):
         return self.p.returncode is not None
 
     def update_pty(self, columns: int, lines: int) -> None:
-        s = struct.pack("HHHH", lines, columns, 0, 0)
+        s = _WINSZ.pack(lines, columns, 0, 0)
         fcntl.ioctl(self.pty_master, termios.TIOCSWINSZ, s, False)
 
 
@@ -355,6 +355,30 @@ def selftest_machine_channel(lab: typing.Optional[linux.Lab] = None,) -> None:
         out = ch.read()
         assert out == b"ABCDEFGHIJKLMNOPQRSTUVWXYZ", repr(out)
 
+    with channel.SubprocessChannel() as ch:
+        ch.read()
+        # Test writing more than fits into the pty's buffer at once
+        ch.sendline("stty -echo; echo READY; cat >/dev/null", read_back=True)
+        ch.read_until_prompt("READY\r\n")
+        ch.write((b"x" * 99 + b"\n") * 2000)
+
+    with channel.SubprocessChannel() as ch:
+        ch.read_until_timeout(0.5)
+        # Test timeouts on an idle channel
+        raised = False
+        try:
+            ch.read(timeout=0.0)
+        except TimeoutError:
+            raised = True
+        assert raised, "Zero timeout did not time out"
+
+        raised = False
+        try:
+            ch.read(timeout=-0.5)
+        except ValueError:
+            raised = True
+        assert raised, "Negative timeout was not rejected"
+
     with channel.SubprocessChannel() as ch:
         ch.read()
         # Test read iter